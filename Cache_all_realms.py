@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Fetch all WoW realms automatically and cache their full JSON data in a local shelve database.
+Fetch all WoW realms automatically and cache their full JSON data in the local SQLite cache (`realms` table).
 
 Usage:
   python cache_all_realms.py
@@ -12,9 +12,10 @@ Requires:
 import os
 import sys
 import time
-import requests
-import shelve
 from dotenv import load_dotenv
+from auth import load_token, save_token
+from kvstore import KV
+from net import BLIZZ_SESSION, parse_json
 
 # Load credentials
 script_dir = os.path.dirname(__file__)
@@ -35,6 +36,7 @@ REALM_URL      = f'https://{REGION}.api.blizzard.com/data/wow/realm/{{slug}}'
 CACHE_DIR = os.path.join(script_dir, '.cache')
 os.makedirs(CACHE_DIR, exist_ok=True)
 DB_PATH = os.path.join(CACHE_DIR, 'realms_cache.db')
+REALMS_DB = KV('realms', legacy=DB_PATH)
 
 # Token cache
 o_blizz_token = None
@@ -46,25 +48,31 @@ def get_blizz_token():
     now = time.time()
     if o_blizz_token and now < _blizz_expiry:
         return o_blizz_token
-    resp = requests.post(
+    token, expiry = load_token('blizzard')
+    if token and now < expiry:
+        o_blizz_token, _blizz_expiry = token, expiry
+        BLIZZ_SESSION.headers['Authorization'] = f'Bearer {o_blizz_token}'
+        return o_blizz_token
+    resp = BLIZZ_SESSION.post(
         OAUTH_URL,
         data={'grant_type': 'client_credentials'},
         auth=(BLIZZ_CLIENT_ID, BLIZZ_CLIENT_SECRET)
     )
     resp.raise_for_status()
-    data = resp.json()
+    data = parse_json(resp)
     o_blizz_token = data['access_token']
     _blizz_expiry = now + data.get('expires_in', 1800) - 60
+    BLIZZ_SESSION.headers['Authorization'] = f'Bearer {o_blizz_token}'
+    save_token('blizzard', o_blizz_token, _blizz_expiry)
     return o_blizz_token
 
 # Fetch all realm slugs from index
 def fetch_all_slugs():
-    token = get_blizz_token()
-    headers = {'Authorization': f'Bearer {token}'}
+    get_blizz_token()
     params = {'namespace': f'dynamic-{REGION}', 'locale': 'en_US'}
-    resp = requests.get(REALM_INDEX_URL, headers=headers, params=params)
+    resp = BLIZZ_SESSION.get(REALM_INDEX_URL, params=params)
     resp.raise_for_status()
-    items = resp.json().get('realms', [])
+    items = parse_json(resp).get('realms', [])
     slugs = []
     for entry in items:
         href = entry.get('key', {}).get('href', '')
@@ -75,13 +83,12 @@ def fetch_all_slugs():
 
 # Fetch full realm data by slug
 def fetch_realm_data(slug):
-    token = get_blizz_token()
+    get_blizz_token()
     url = REALM_URL.format(slug=slug)
-    headers = {'Authorization': f'Bearer {token}'}
     params = {'namespace': f'dynamic-{REGION}', 'locale': 'en_US'}
-    resp = requests.get(url, headers=headers, params=params)
+    resp = BLIZZ_SESSION.get(url, params=params)
     resp.raise_for_status()
-    return resp.json()
+    return parse_json(resp)
 
 # Main caching process
 def main():
@@ -89,16 +96,16 @@ def main():
     slugs = fetch_all_slugs()
     print(f'Found {len(slugs)} realms, caching full data...')
 
-    with shelve.open(DB_PATH) as db:
-        for slug in slugs:
-            try:
-                data = fetch_realm_data(slug)
-                realm_id = str(data.get('id'))
-                db[realm_id] = data
-            except Exception as e:
-                print(f"Failed to cache {slug}: {e}", file=sys.stderr)
+    realms = {}
+    for slug in slugs:
+        try:
+            data = fetch_realm_data(slug)
+            realms[str(data.get('id'))] = data
+        except Exception as e:
+            print(f"Failed to cache {slug}: {e}", file=sys.stderr)
+    REALMS_DB.update(realms)
 
-    print(f'Cached {len(db)} realms to {DB_PATH}')
+    print(f'Cached {len(REALMS_DB)} realms to {REALMS_DB.table}')
 
 if __name__ == '__main__':
     main()
@@ -4,46 +4,58 @@ Servana CLI – Auction Data Fetcher with Name & Image Caching
 
 Part of the Servana WoW AH Price Checker suite. This script:
   • Fetches raw auction data for a specified connected-realm (default 4)
-  • Caches all unique item names to `.cache/item_name_cache.db`
-  • Caches all unique item icon URLs to `.cache/item_pic_cache.db`
-  • Writes the full auction JSON to a file
+  • Caches all unique item names to `.cache/servana.db` (item_names)
+  • Caches all unique item icon URLs to `.cache/servana.db` (item_pics)
+  • Optionally (--save-raw) writes the full auction JSON to a file
 
 Usage:
-  servana --realm <ID>
+  servana --realm <ID> [--save-raw]
 
 Requires:
   • python-dotenv
   • requests
 
 Outputs:
-  • auctions_<realm>_raw.json      – full auction list
-  • .cache/item_name_cache.db      – shelve of item IDs → names
-  • .cache/item_pic_cache.db       – shelve of item IDs → icon URLs
+  • auctions_<realm>_raw.json      – full auction list (with --save-raw)
+  • .cache/servana.db              – SQLite tables of item IDs → names / icon URLs
 """
 
 import os
 import time
 import argparse
-import json
 import requests
-import shelve
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from auth import load_token, save_token
+from kvstore import KV, CACHE_DIR
+from net import BLIZZ_SESSION as _session, parse_json, dumps
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # Load environment variables from .env or system
 load_dotenv()
 
-# Ensure cache directory exists
-CACHE_DIR = ".cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
+# Concurrent name/pic lookups (bounded to stay under Blizzard's rate limit)
+MAX_WORKERS = 16
+
+# Item IDs per bulk name search (keeps the `id=a||b||...` query string well under URL limits)
+SEARCH_CHUNK = 500
 
 # OAuth & API endpoints
 TOKEN_URL = "https://us.battle.net/oauth/token"
 BASE_API  = "https://us.api.blizzard.com/data/wow"
 
-# Cache filenames (in `.cache/` directory)
+# Legacy shelve files (in the repo's `.cache/` directory, not cwd), imported on first use
 NAME_CACHE = os.path.join(CACHE_DIR, "item_name_cache.db")
 PIC_CACHE  = os.path.join(CACHE_DIR, "item_pic_cache.db")
 
+# Same tables the GUI reads through api.NAME_DB / api.PIC_DB
+NAME_DB = KV("item_names", legacy=NAME_CACHE)
+PIC_DB  = KV("item_pics",  legacy=PIC_CACHE)
+
 # Token cache
 _cached_token = None
 _token_expiry  = 0.0
@@ -52,103 +64,170 @@ _token_expiry  = 0.0
 def fetch_token(client_id: str, client_secret: str) -> None:
     """Fetch and cache a new Blizzard OAuth token."""
     global _cached_token, _token_expiry
-    resp = requests.post(
+    resp = _session.post(
         TOKEN_URL,
         data={"grant_type": "client_credentials"},
         auth=(client_id, client_secret)
     )
     resp.raise_for_status()
-    data = resp.json()
+    data = parse_json(resp)
     _cached_token = data["access_token"]
     _token_expiry = time.time() + data["expires_in"]
+    _session.headers["Authorization"] = f"Bearer {_cached_token}"
+    save_token("blizzard", _cached_token, _token_expiry - 60)
     print(f"[token] fetched new token; expires in {data['expires_in']}s")
 
 
 def get_token(client_id: str, client_secret: str) -> str:
-    """Return a valid Bearer token, refreshing if near expiry."""
+    """Return a valid Bearer token, reusing the persisted one or refreshing if near expiry."""
     global _cached_token, _token_expiry
     if _cached_token is None or time.time() > (_token_expiry - 300):
-        fetch_token(client_id, client_secret)
+        token, expiry = load_token("blizzard")
+        if token and time.time() < (expiry - 300):
+            _cached_token, _token_expiry = token, expiry
+            _session.headers["Authorization"] = f"Bearer {_cached_token}"
+        else:
+            fetch_token(client_id, client_secret)
     return _cached_token
 
 
 def fetch_raw_auctions(realm_id: int, client_id: str, client_secret: str) -> dict:
     """Fetch full JSON auctions for a connected-realm."""
-    token = get_token(client_id, client_secret)
+    get_token(client_id, client_secret)
+    url = f"{BASE_API}/connected-realm/{realm_id}/auctions"
+    params = {"namespace": "dynamic-us", "locale": "en_US"}
+    resp = _session.get(url, params=params)
+    resp.raise_for_status()
+    return parse_json(resp)
+
+
+def fetch_auction_item_ids(realm_id: int, client_id: str, client_secret: str) -> set:
+    """
+    Collect the unique item IDs on a connected-realm's auctions. With ijson
+    installed only the item IDs are stream-parsed out of the response, so the
+    full auction list is never materialized.
+    """
+    if ijson is None:
+        data = fetch_raw_auctions(realm_id, client_id, client_secret)
+        return {a['item']['id'] for a in data.get('auctions', [])}
+    get_token(client_id, client_secret)
     url = f"{BASE_API}/connected-realm/{realm_id}/auctions"
-    headers = {"Authorization": f"Bearer {token}"}
     params = {"namespace": "dynamic-us", "locale": "en_US"}
-    resp = requests.get(url, headers=headers, params=params)
+    with _session.get(url, params=params, stream=True) as resp:
+        resp.raise_for_status()
+        resp.raw.decode_content = True
+        return set(ijson.items(resp.raw, "auctions.item.item.id"))
+
+
+def fetch_name(item_id: int) -> str:
+    """Fetch a single item's name from the static namespace."""
+    resp = _session.get(
+        f"{BASE_API}/item/{item_id}",
+        params={"namespace": "static-us", "locale": "en_US"}
+    )
     resp.raise_for_status()
-    return resp.json()
+    return parse_json(resp).get("name", "Unknown Item")
+
+
+def search_names(item_ids) -> dict:
+    """
+    Fetch names for a batch of items with one item search request.
+    Returns {item_id (str): name} for the items the search found.
+    """
+    resp = _session.get(
+        f"{BASE_API}/search/item",
+        params={
+            "namespace": "static-us",
+            "id": "||".join(map(str, item_ids)),
+            "orderby": "id",
+            "_pageSize": SEARCH_CHUNK,
+        }
+    )
+    resp.raise_for_status()
+    names = {}
+    for result in parse_json(resp).get("results", []):
+        data = result.get("data", {})
+        name = data.get("name")
+        if isinstance(name, dict):  # search results carry every locale
+            name = name.get("en_US")
+        if name:
+            names[str(data["id"])] = name
+    return names
+
+
+def fetch_names(item_ids) -> dict:
+    """
+    Fetch names for many items: bulk searches of SEARCH_CHUNK IDs run
+    concurrently, then anything the search missed is fetched one by one.
+    """
+    chunks = [item_ids[i:i + SEARCH_CHUNK] for i in range(0, len(item_ids), SEARCH_CHUNK)]
+    names = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        for fut in as_completed([pool.submit(search_names, chunk) for chunk in chunks]):
+            try:
+                names.update(fut.result())
+            except requests.HTTPError as e:
+                print(f"[name-search] batch failed, falling back to per-item lookups: {e}")
+    leftover = [i for i in item_ids if str(i) not in names]
+    names.update(fetch_parallel(fetch_name, leftover, "name-cache"))
+    return names
+
+
+def fetch_pic(item_id: int):
+    """Fetch a single item's icon URL from the static namespace (None if absent)."""
+    resp = _session.get(
+        f"{BASE_API}/media/item/{item_id}",
+        params={"namespace": "static-us", "locale": "en_US"}
+    )
+    resp.raise_for_status()
+    assets = parse_json(resp).get("assets", [])
+    return {a.get("key"): a.get("value") for a in assets}.get("icon")
+
+
+def fetch_parallel(fetch, item_ids, label: str):
+    """
+    Run `fetch` for each item ID on a bounded thread pool, yielding
+    (key, value) pairs as they complete. Failures are logged and skipped.
+    """
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {pool.submit(fetch, item_id): item_id for item_id in item_ids}
+        for fut in as_completed(futures):
+            item_id = futures[fut]
+            try:
+                yield str(item_id), fut.result()
+            except requests.HTTPError as e:
+                print(f"[{label}] failed for {item_id}: {e}")
 
 
 def cache_names_and_pics(item_ids: set, client_id: str, client_secret: str) -> None:
     """
-    Fetch and cache names and icon URLs for each unique item ID,
-    calling `.sync()` immediately after each write to flush the shelf.
+    Fetch and cache names and icon URLs for each unique item ID.
+    Missing entries are fetched concurrently, then each table is written
+    in a single transaction.
     """
-    token = get_token(client_id, client_secret)
-    name_new = 0
-    pic_new  = 0
-
-    # Open both shelves and keep them around for syncing
-    with shelve.open(NAME_CACHE) as name_db, shelve.open(PIC_CACHE) as pic_db:
-        for item_id in item_ids:
-            key = str(item_id)
-
-            # Cache name + sync
-            if key not in name_db:
-                try:
-                    name_url = f"{BASE_API}/item/{item_id}"
-                    resp = requests.get(
-                        name_url,
-                        headers={"Authorization": f"Bearer {token}"},
-                        params={"namespace": "static-us", "locale": "en_US"}
-                    )
-                    resp.raise_for_status()
-                    name = resp.json().get("name", "Unknown Item")
-
-                    name_db[key] = name
-                    name_db.sync()              # ← flush name immediately
-                    name_new += 1
-                except requests.HTTPError as e:
-                    print(f"[name-cache] failed for {item_id}: {e}")
-
-            # Cache icon URL + sync
-            if key not in pic_db:
-                try:
-                    pic_url = f"{BASE_API}/media/item/{item_id}"
-                    resp = requests.get(
-                        pic_url,
-                        headers={"Authorization": f"Bearer {token}"},
-                        params={"namespace": "static-us", "locale": "en_US"}
-                    )
-                    resp.raise_for_status()
-                    assets = resp.json().get("assets", [])
-                    icon = next((a.get("value") for a in assets if a.get("key") == "icon"), None)
-
-                    if icon:
-                        pic_db[key] = icon
-                        pic_db.sync()           # ← flush pic immediately
-                        pic_new += 1
-                except requests.HTTPError as e:
-                    print(f"[pic-cache] failed for {item_id}: {e}")
-
-        # Compute totals while shelves are still open
-        total_names = len(name_db)
-        total_pics  = len(pic_db)
-
-    # Shelves auto-close here
-    print(f"[cache] cached {name_new} new names, {pic_new} new icons; "
-          f"total names={total_names}, total icons={total_pics}")
+    get_token(client_id, client_secret)
+
+    # One key scan per table instead of a lookup per item
+    have_names = set(NAME_DB.keys())
+    have_pics  = set(PIC_DB.keys())
+    missing_names = [i for i in item_ids if str(i) not in have_names]
+    missing_pics  = [i for i in item_ids if str(i) not in have_pics]
+
+    names = fetch_names(missing_names)
+    NAME_DB.update(names)
+
+    icons = {k: icon for k, icon in fetch_parallel(fetch_pic, missing_pics, "pic-cache") if icon}
+    PIC_DB.update(icons)
+
+    print(f"[cache] cached {len(names)} new names, {len(icons)} new icons; "
+          f"total names={len(NAME_DB)}, total icons={len(PIC_DB)}")
 
 
 def save_json(data: dict, realm_id: int) -> None:
-    """Write raw JSON to auctions_<realm>_raw.json."""
+    """Write raw JSON (compact, no indentation) to auctions_<realm>_raw.json."""
     fn = f"auctions_{realm_id}_raw.json"
-    with open(fn, 'w') as f:
-        json.dump(data, f, indent=2)
+    with open(fn, 'wb') as f:
+        f.write(dumps(data))
     print(f"[json] saved raw data to {fn}")
 
 
@@ -164,12 +243,17 @@ def main():
                                      description="Fetch auctions & cache item names/pics")
     parser.add_argument('--realm', '-r', type=int, default=4,
                         help='Connected-realm ID (default: 4)')
+    parser.add_argument('--save-raw', '-S', action='store_true',
+                        help='Also write the full auction JSON to auctions_<realm>_raw.json')
     args = parser.parse_args()
 
     try:
-        data = fetch_raw_auctions(args.realm, client_id, client_secret)
-        save_json(data, args.realm)
-        ids = {a['item']['id'] for a in data.get('auctions', [])}
+        if args.save_raw:
+            data = fetch_raw_auctions(args.realm, client_id, client_secret)
+            save_json(data, args.realm)
+            ids = {a['item']['id'] for a in data.get('auctions', [])}
+        else:
+            ids = fetch_auction_item_ids(args.realm, client_id, client_secret)
         cache_names_and_pics(ids, client_id, client_secret)
     except requests.HTTPError as e:
         print(f"HTTP {e.response.status_code}: {e.response.text}")
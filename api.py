@@ -1,163 +1,215 @@
 #!/usr/bin/env python3
-import time
-import requests
-import shelve
+import io
+import os
+import functools
 import threading
+import requests
+from concurrent.futures import Future
 from auth import get_blizzard_token, get_tsm_token
-from manage_realms_csv import load_selected_realms
+from kvstore import KV, CACHE_DIR
+from net import BLIZZ_SESSION, TSM_SESSION, MEDIA_SESSION, parse_json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # === Constants ===
 TSM_REGION_ID     = 1
 NAMESPACE         = "dynamic-us"
 STATIC_NAMESPACE  = "static-us"
 LOCALE            = "en_US"
-TSM_CACHE         = "./.cache/tsm_cache.db"
-NAME_CACHE        = "./.cache/item_name_cache.db"
-PIC_CACHE         = "./.cache/item_pic_cache.db"
-AUCTION_CACHE     = "./.cache/auction_cache.db"
+TSM_CACHE         = os.path.join(CACHE_DIR, "tsm_cache.db")
+NAME_CACHE        = os.path.join(CACHE_DIR, "item_name_cache.db")
+PIC_CACHE         = os.path.join(CACHE_DIR, "item_pic_cache.db")
+AUCTION_CACHE     = os.path.join(CACHE_DIR, "auction_cache.db")
+
+# Item icon size shown in the UI (icons are cached pre-resized to this)
+ICON_SIZE         = (48, 48)
+
+# Shared query strings (requests never mutates them); the bearer header lives on BLIZZ_SESSION
+DYNAMIC_PARAMS    = {"namespace": NAMESPACE, "locale": LOCALE}
+STATIC_PARAMS     = {"namespace": STATIC_NAMESPACE, "locale": LOCALE}
 
+# TSM region stats move with the market; refetch them after this long
+TSM_TTL           = 3600
 
+# SQLite-backed caches (the shelve paths above are imported once, on first use;
+# AUCTION_CACHE is imported by cache.py into its own tables)
+TSM_DB  = KV("tsm_stats",  legacy=TSM_CACHE, ttl=TSM_TTL)
+NAME_DB = KV("item_names", legacy=NAME_CACHE)
+PIC_DB  = KV("item_pics",  legacy=PIC_CACHE)
+ICON_DB = KV("item_icons", memo=256)  # pre-resized icon PNGs, so relaunches skip CDN + resize
+
+
+def _coalesced(fetch):
+    """
+    Let concurrent calls for the same item share one in-flight lookup instead
+    of each missing the cache and issuing its own request.
+    """
+    inflight = {}
+    lock = threading.Lock()
+
+    @functools.wraps(fetch)
+    def wrapper(item_id):
+        key = str(item_id)
+        with lock:
+            fut = inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = inflight[key] = Future()
+        if not owner:
+            return fut.result()
+        try:
+            result = fetch(item_id)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with lock:
+                del inflight[key]
+        fut.set_result(result)
+        return result
+
+    return wrapper
+
+
+@_coalesced
 def get_tsm_region_stats(item_id):
     """
-    Fetch TSM marketValue and saleRate, caching results locally.
+    Fetch TSM marketValue and saleRate, caching results locally for TSM_TTL seconds.
     """
     key = str(item_id)
-    with shelve.open(TSM_CACHE) as db:
-        if key in db:
-            return db[key]
+    cached = TSM_DB.get(key)
+    if cached is not None:
+        return cached
 
-    token = get_tsm_token()
-    if not token:
+    if not get_tsm_token():
         return None, None
 
     try:
-        resp = requests.get(
-            f"https://pricing-api.tradeskillmaster.com/region/{TSM_REGION_ID}/item/{item_id}",
-            headers={"Authorization": f"Bearer {token}"}
+        resp = TSM_SESSION.get(
+            f"https://pricing-api.tradeskillmaster.com/region/{TSM_REGION_ID}/item/{item_id}"
         )
         if resp.status_code == 404:
             mv, sr = None, None
         else:
             resp.raise_for_status()
-            data = resp.json()
+            data = parse_json(resp)
             mv, sr = data.get("marketValue"), data.get("saleRate")
     except requests.exceptions.HTTPError:
         mv, sr = None, None
 
-    with shelve.open(TSM_CACHE) as db:
-        db[key] = (mv, sr)
+    TSM_DB[key] = (mv, sr)
     return mv, sr
 
 
+@_coalesced
 def get_blizzard_name(item_id):
     """
     Fetch and cache the Blizzard item name (static namespace).
     """
     key = str(item_id)
-    with shelve.open(NAME_CACHE) as db:
-        if key in db:
-            return db[key]
+    cached = NAME_DB.get(key)
+    if cached is not None:
+        return cached
 
-    token = get_blizzard_token()
-    resp = requests.get(
+    get_blizzard_token()
+    resp = BLIZZ_SESSION.get(
         f"https://us.api.blizzard.com/data/wow/item/{item_id}",
-        headers={"Authorization": f"Bearer {token}"},
-        params={"namespace": STATIC_NAMESPACE, "locale": LOCALE}
+        params=STATIC_PARAMS
     )
     resp.raise_for_status()
-    name = resp.json().get("name", "Unknown Item")
+    name = parse_json(resp).get("name", "Unknown Item")
 
-    with shelve.open(NAME_CACHE) as db:
-        db[key] = name
+    NAME_DB[key] = name
     return name
 
 
+@_coalesced
 def get_blizzard_pic(item_id):
     """
     Fetch and cache the Blizzard item icon URL (static namespace).
     """
     key = str(item_id)
-    with shelve.open(PIC_CACHE) as db:
-        if key in db:
-            return db[key]
+    cached = PIC_DB.get(key)
+    if cached is not None:
+        return cached
 
-    token = get_blizzard_token()
-    resp = requests.get(
+    get_blizzard_token()
+    resp = BLIZZ_SESSION.get(
         f"https://us.api.blizzard.com/data/wow/media/item/{item_id}",
-        headers={"Authorization": f"Bearer {token}"},
-        params={"namespace": STATIC_NAMESPACE, "locale": LOCALE}
+        params=STATIC_PARAMS
     )
     resp.raise_for_status()
-    assets = resp.json().get("assets", [])
-    icon = next((a["value"] for a in assets if a.get("key") == "icon"), None)
+    assets = parse_json(resp).get("assets", [])
+    icon = {a.get("key"): a.get("value") for a in assets}.get("icon")
 
     if icon:
-        with shelve.open(PIC_CACHE) as db:
-            db[key] = icon
+        PIC_DB[key] = icon
     return icon
 
 
-def get_realm_auctions(realm_id):
+@_coalesced
+def get_item_icon(item_id):
     """
-    Fetch the raw auctions list for a connected realm from Blizzard API.
+    Return the item's icon as PNG bytes already resized to ICON_SIZE (or None).
+    The download and LANCZOS resize happen once; later calls read the cached bytes.
     """
-    token = get_blizzard_token()
-    url = f"https://us.api.blizzard.com/data/wow/connected-realm/{realm_id}/auctions"
-    params = {"namespace": NAMESPACE, "locale": LOCALE}
-    resp = requests.get(
-        url,
-        headers={"Authorization": f"Bearer {token}"},
-        params=params
-    )
+    key = f"{item_id}:{ICON_SIZE[0]}x{ICON_SIZE[1]}"
+    cached = ICON_DB.get(key)
+    if cached is not None:
+        return cached
+
+    pic = get_blizzard_pic(item_id)
+    if not pic:
+        return None
+    resp = MEDIA_SESSION.get(pic)
     resp.raise_for_status()
-    return resp.json()
+    from PIL import Image  # only needed on a cache miss; keeps api importable without the GUI stack
+    img = Image.open(io.BytesIO(resp.content))
+    img.draft("RGB", ICON_SIZE)  # Blizzard icons are JPEGs; lets libjpeg decode at a reduced scale
+    buf = io.BytesIO()
+    img.resize(ICON_SIZE, Image.LANCZOS).save(buf, format="PNG")
+    icon = ICON_DB[key] = buf.getvalue()
+    return icon
 
 
-def cache_realm_auctions(realm_id):
-    """
-    Fetch and store lowest buyout for each item in the given realm into local cache.
+def open_realm_auctions(realm_id, since=None, etag=None):
     """
-    data = get_realm_auctions(realm_id)
-    auctions = data.get("auctions", [])
-    realm_key = str(realm_id)
-    with shelve.open(AUCTION_CACHE) as db:
-        realm_data = db.get(realm_key, {})
-        for auc in auctions:
-            item = auc.get("item", {}).get("id")
-            buyout = auc.get("buyout")
-            if item is not None and buyout is not None:
-                existing = realm_data.get(str(item))
-                realm_data[str(item)] = buyout if existing is None else min(existing, buyout)
-        realm_data["_ts"] = time.time()
-        db[realm_key] = realm_data
-    return realm_data
-
-
-def get_cached_auctions(realm_id):
+    Start fetching a connected realm's auctions as a conditional GET, sending
+    If-Modified-Since / If-None-Match when `since` (a previous Last-Modified)
+    or `etag` is given.
+    Returns (last_modified, etag, auctions) where `auctions` iterates the
+    auction rows, or (since, etag, None) if Blizzard reports them unchanged (304).
     """
-    Retrieve cached buyouts for a realm; returns dict of item_id->buyout.
-    """
-    with shelve.open(AUCTION_CACHE) as db:
-        return db.get(str(realm_id), {})
+    get_blizzard_token()
+    url = f"https://us.api.blizzard.com/data/wow/connected-realm/{realm_id}/auctions"
+    headers = {}
+    if since:
+        headers["If-Modified-Since"] = since
+    if etag:
+        headers["If-None-Match"] = etag
+    resp = BLIZZ_SESSION.get(url, params=DYNAMIC_PARAMS, headers=headers, stream=ijson is not None)
+    if resp.status_code == 304:
+        resp.close()
+        return since, etag, None
+    try:
+        resp.raise_for_status()
+    except requests.HTTPError:
+        resp.close()
+        raise
+    last_modified, etag = resp.headers.get("Last-Modified"), resp.headers.get("ETag")
+    if ijson is None:
+        return last_modified, etag, parse_json(resp).get("auctions", [])
+    return last_modified, etag, _stream_auctions(resp)
 
 
-def cache_selected_realms_auctions():
+def _stream_auctions(resp):
     """
-    Cache auctions for all currently selected realms using threading.
+    Stream-parse auction rows from an open response, so the full payload is
+    never held in memory.
     """
-    realms = load_selected_realms()
-    results = {}
-    threads = []
-
-    def worker(rid):
-        results[rid] = cache_realm_auctions(rid)
-
-    for rid in realms:
-        t = threading.Thread(target=worker, args=(rid,), daemon=True)
-        t.start()
-        threads.append(t)
-
-    for t in threads:
-        t.join()
-
-    return results
+    with resp:
+        resp.raw.decode_content = True
+        yield from ijson.items(resp.raw, "auctions.item")
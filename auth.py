@@ -1,7 +1,10 @@
 import os
 import time
+import tempfile
+import threading
 import requests
 from dotenv import load_dotenv
+from net import BLIZZ_SESSION, TSM_SESSION, loads, dumps, parse_json
 
 # Load environment variables from .env
 load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
@@ -10,39 +13,125 @@ load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 BLIZZ_TOKEN_URL = "https://oauth.battle.net/token"
 TSM_TOKEN_URL   = "https://auth.tradeskillmaster.com/oauth2/token"
 
+# Tokens shared across processes (GUI and CLI runs) so each doesn't re-auth
+TOKEN_FILE = os.path.join(os.path.dirname(__file__), ".cache", "tokens.json")
+
 # Caches for tokens
 _cached_blizz = None
 _blizz_expiry = 0
 _cached_tsm   = None
 _tsm_expiry   = 0
 
-def get_blizzard_token():
+# One refresh at a time per API; concurrent callers wait and reuse its token
+_blizz_lock = threading.Lock()
+_tsm_lock   = threading.Lock()
+
+# Serializes TOKEN_FILE read-modify-writes, so overlapping refreshes don't drop each other's token
+_file_lock  = threading.Lock()
+
+# Tokens this close to expiry (seconds) are still served, but renewed in the background
+REFRESH_AHEAD = 300
+
+def _read_tokens():
+    try:
+        with open(TOKEN_FILE, "rb") as f:
+            return loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+def load_token(name):
+    """
+    Return the (token, expiry) persisted under `name`, or (None, 0).
+    """
+    entry = _read_tokens().get(name) or {}
+    return entry.get("token"), entry.get("expiry", 0)
+
+def save_token(name, token, expiry):
+    """
+    Persist a token atomically (temp file + os.replace), readable only by the owner.
+    Writers in this process are serialized, so concurrent saves keep both tokens.
     """
-    Retrieve and cache a Blizzard API token using client credentials.
+    with _file_lock:
+        tokens = _read_tokens()
+        tokens[name] = {"token": token, "expiry": expiry}
+        os.makedirs(os.path.dirname(TOKEN_FILE), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(TOKEN_FILE))  # created with mode 0600
+        with os.fdopen(fd, "wb") as f:
+            f.write(dumps(tokens))
+        os.replace(tmp, TOKEN_FILE)
+
+def _refresh_ahead(lock, refresh):
+    """
+    Run `refresh` on a daemon thread unless one already holds `lock`, so
+    callers keep using the current, still-valid token in the meantime.
+    """
+    if not lock.acquire(blocking=False):
+        return
+    def run():
+        try:
+            refresh()
+        except Exception as e:
+            print(f"Background token refresh failed: {e}")
+        finally:
+            lock.release()
+    threading.Thread(target=run, daemon=True).start()
+
+def _refresh_blizzard():
+    """
+    Renew the Blizzard token (caller holds _blizz_lock), preferring a fresh
+    one another process persisted to TOKEN_FILE.
     """
     global _cached_blizz, _blizz_expiry
     now = time.time()
-    if _cached_blizz and now < _blizz_expiry:
+    token, expiry = load_token("blizzard")
+    if token and now < expiry - REFRESH_AHEAD:
+        _cached_blizz, _blizz_expiry = token, expiry
+        BLIZZ_SESSION.headers["Authorization"] = f"Bearer {_cached_blizz}"
         return _cached_blizz
-    resp = requests.post(
+    resp = BLIZZ_SESSION.post(
         BLIZZ_TOKEN_URL,
         data={"grant_type": "client_credentials"},
         auth=(os.getenv("BLIZZARD_CLIENT_ID"), os.getenv("BLIZZARD_CLIENT_SECRET"))
     )
     resp.raise_for_status()
-    data = resp.json()
+    data = parse_json(resp)
     _cached_blizz = data["access_token"]
     _blizz_expiry = now + data.get("expires_in", 1800) - 60
+    BLIZZ_SESSION.headers["Authorization"] = f"Bearer {_cached_blizz}"
+    save_token("blizzard", _cached_blizz, _blizz_expiry)
     return _cached_blizz
 
-def get_tsm_token():
+def get_blizzard_token():
     """
-    Retrieve and cache a TSM API token using API key.
-    Falls back to None on errors.
+    Retrieve and cache a Blizzard API token using client credentials,
+    installing it as the bearer header on BLIZZ_SESSION.
+    Reuses a still-valid token persisted in TOKEN_FILE before re-authenticating.
+    Within REFRESH_AHEAD of expiry the current token is returned immediately
+    and renewed in the background; only an expired token blocks the caller.
+    """
+    now = time.time()
+    if _cached_blizz and now < _blizz_expiry:
+        if now >= _blizz_expiry - REFRESH_AHEAD:
+            _refresh_ahead(_blizz_lock, _refresh_blizzard)
+        return _cached_blizz
+    with _blizz_lock:
+        # Re-check: another thread may have refreshed while we waited
+        if _cached_blizz and time.time() < _blizz_expiry:
+            return _cached_blizz
+        return _refresh_blizzard()
+
+def _refresh_tsm():
+    """
+    Renew the TSM token (caller holds _tsm_lock), preferring a fresh one
+    another process persisted to TOKEN_FILE. Returns None on errors,
+    leaving any current token in place.
     """
     global _cached_tsm, _tsm_expiry
     now = time.time()
-    if _cached_tsm and now < _tsm_expiry:
+    token, expiry = load_token("tsm")
+    if token and now < expiry - REFRESH_AHEAD:
+        _cached_tsm, _tsm_expiry = token, expiry
+        TSM_SESSION.headers["Authorization"] = f"Bearer {_cached_tsm}"
         return _cached_tsm
     body = {
         "client_id": os.getenv("TSM_CLIENT_ID"),
@@ -51,12 +140,38 @@ def get_tsm_token():
         "token": os.getenv("TSM_API_KEY")
     }
     try:
-        resp = requests.post(TSM_TOKEN_URL, json=body)
+        # Drop any stale bearer header; the token endpoint authenticates via the body
+        resp = TSM_SESSION.post(TSM_TOKEN_URL, json=body, headers={"Authorization": None})
         resp.raise_for_status()
     except requests.exceptions.HTTPError as e:
         print(f"TSM auth failed: {e}")
         return None
-    data = resp.json()
-    _cached_tsm = data.get("access_token")
+    data = parse_json(resp)
+    token = data.get("access_token")
+    if not token:
+        print("TSM auth failed: no access_token in response")
+        return None
+    _cached_tsm = token
     _tsm_expiry = now + data.get("expires_in", 3600) - 60
+    TSM_SESSION.headers["Authorization"] = f"Bearer {_cached_tsm}"
+    save_token("tsm", _cached_tsm, _tsm_expiry)
     return _cached_tsm
+
+def get_tsm_token():
+    """
+    Retrieve and cache a TSM API token using API key,
+    installing it as the bearer header on TSM_SESSION.
+    Reuses a still-valid token persisted in TOKEN_FILE before re-authenticating,
+    and renews it in the background within REFRESH_AHEAD of expiry.
+    Falls back to None on errors.
+    """
+    now = time.time()
+    if _cached_tsm and now < _tsm_expiry:
+        if now >= _tsm_expiry - REFRESH_AHEAD:
+            _refresh_ahead(_tsm_lock, _refresh_tsm)
+        return _cached_tsm
+    with _tsm_lock:
+        # Re-check: another thread may have refreshed while we waited
+        if _cached_tsm and time.time() < _tsm_expiry:
+            return _cached_tsm
+        return _refresh_tsm()
@@ -1,72 +1,197 @@
 #!/usr/bin/env python3
 import time
-import threading
-import shelve
-from api import get_realm_auctions
-from manage_realms_csv import load_selected_realms
+from concurrent.futures import ThreadPoolExecutor
+from api import open_realm_auctions, AUCTION_CACHE
+from kvstore import transaction, query, legacy_items
 
-# Path to the auctions cache (shelf)
-AUCTION_CACHE = "./.cache/auction_cache.db"
+# Concurrent realm downloads (each auctions dump is a large, I/O-bound GET)
+REALM_WORKERS = 8
+
+# Blizzard republishes auction snapshots about hourly; older ones are re-checked
+AUCTION_TTL = 3600
+
+_tables_ready = False
+
+
+def _ensure_tables():
+    """
+    Create the auction tables on first use, seeded from the legacy
+    per-realm AUCTION_CACHE shelf.
+    """
+    global _tables_ready
+    if not _tables_ready:
+        with transaction() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='auction_prices'"
+            ).fetchone()
+            if not exists:
+                conn.execute(
+                    "CREATE TABLE auction_prices ("
+                    " realm INTEGER NOT NULL, item INTEGER NOT NULL, buyout INTEGER NOT NULL,"
+                    " PRIMARY KEY (realm, item)) WITHOUT ROWID"
+                )
+                conn.execute(
+                    "CREATE TABLE auction_meta ("
+                    " realm INTEGER PRIMARY KEY, ts REAL NOT NULL, lm TEXT, etag TEXT)"
+                )
+                for realm_key, realm_data in legacy_items(AUCTION_CACHE):
+                    ts = realm_data.pop('_ts', 0)
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO auction_prices (realm, item, buyout) VALUES (?, ?, ?)",
+                        [(int(realm_key), int(item), buyout) for item, buyout in realm_data.items()]
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO auction_meta (realm, ts) VALUES (?, ?)",
+                        (int(realm_key), ts)
+                    )
+            else:
+                cols = [row[1] for row in conn.execute("PRAGMA table_info(auction_meta)")]
+                # Databases created before conditional-GET validators were tracked
+                for col in ("lm", "etag"):
+                    if col not in cols:
+                        conn.execute(f"ALTER TABLE auction_meta ADD COLUMN {col} TEXT")
+        _tables_ready = True
+
+
+def lowest_buyouts(auctions):
+    """
+    Reduce raw auctions to {item_id: lowest buyout} in a single pass.
+    Auctions without a buyout (e.g. commodities) are skipped.
+    """
+    lowest = {}
+    get = lowest.get
+    for auc in auctions:
+        buyout = auc.get('buyout')
+        if buyout is not None:
+            item = auc['item']['id']
+            # Default of buyout + 1 makes first sightings pass the same comparison
+            if buyout < get(item, buyout + 1):
+                lowest[item] = buyout
+    return lowest
 
 
 def get_cached_price(realm_id, item_id):
     """
     Return the cached lowest buyout price (int) for a given item in a realm, or None if missing.
     """
-    key = str(realm_id)
-    with shelve.open(AUCTION_CACHE) as db:
-        realm_data = db.get(key, {})
-    return realm_data.get(str(item_id))
+    _ensure_tables()
+    rows = query(
+        "SELECT buyout FROM auction_prices WHERE realm = ? AND item = ?",
+        (int(realm_id), int(item_id))
+    )
+    return rows[0][0] if rows else None
+
+
+def get_realm_price(realm_id, item_id):
+    """
+    Return the lowest cached buyout for an item in a realm, first refreshing the
+    realm's snapshot if it is missing or older than AUCTION_TTL.
+    None means the item had no buyout listing in the realm's latest snapshot
+    (or no snapshot could be fetched); a fresh snapshot is trusted, so unlisted
+    items don't trigger another download on every lookup.
+    """
+    _ensure_tables()
+    rows = query("SELECT ts FROM auction_meta WHERE realm = ?", (int(realm_id),))
+    if not rows or rows[0][0] < time.time() - AUCTION_TTL:
+        cache_realm_auctions(realm_id)
+    return get_cached_price(realm_id, item_id)
+
+
+def get_fresh_prices(realm_ids, item_id):
+    """
+    Batched form of get_realm_price for realms whose snapshot is younger than
+    AUCTION_TTL: returns {realm_id: lowest buyout or None} using two queries
+    in total. Realms absent from the result are missing or stale and need
+    get_realm_price (which refreshes them).
+    """
+    _ensure_tables()
+    realm_ids = [int(r) for r in realm_ids]
+    if not realm_ids:
+        return {}
+    marks = ",".join("?" * len(realm_ids))
+    fresh = [realm for (realm,) in query(
+        f"SELECT realm FROM auction_meta WHERE realm IN ({marks}) AND ts >= ?",
+        (*realm_ids, time.time() - AUCTION_TTL)
+    )]
+    if not fresh:
+        return {}
+    marks = ",".join("?" * len(fresh))
+    # (realm, item) is the primary key, so this is one index probe per realm
+    prices = dict(query(
+        f"SELECT realm, buyout FROM auction_prices WHERE item = ? AND realm IN ({marks})",
+        (int(item_id), *fresh)
+    ))
+    return {realm: prices.get(realm) for realm in fresh}
 
 
 def cache_realm_auctions(realm_id):
     """
     Fetch auction data for a single realm and update the cache with lowest buyouts.
+    The request is conditional on the realm's stored Last-Modified/ETag, so an
+    unchanged snapshot is neither downloaded nor parsed.
+    The reduction runs in memory and becomes the realm's cached prices in one
+    transaction: changed buyouts are updated, new items inserted and items no
+    longer listed deleted; unchanged rows are not rewritten.
     Returns the updated dict of item_id->buyout for that realm.
     """
-    data = get_realm_auctions(realm_id)
-    auctions = data.get("auctions", [])
-    key = str(realm_id)
-    with shelve.open(AUCTION_CACHE, writeback=True) as db:
-        realm_data = db.get(key, {})
-        for auc in auctions:
-            item = auc.get('item', {}).get('id')
-            buyout = auc.get('buyout')
-            if item is None or buyout is None:
-                continue
-            item_key = str(item)
-            existing = realm_data.get(item_key)
-            realm_data[item_key] = buyout if existing is None else min(existing, buyout)
-        realm_data['_ts'] = time.time()
-        db[key] = realm_data
-        return realm_data
-
-
-def cache_selected_realms_auctions():
-    """
-    Cache auctions for all realms currently selected in manage_realms_csv, in parallel.
+    realm_id = int(realm_id)
+    _ensure_tables()
+    rows = query("SELECT lm, etag FROM auction_meta WHERE realm = ?", (realm_id,))
+    since, etag = rows[0] if rows else (None, None)
+
+    last_modified, etag, auctions = open_realm_auctions(realm_id, since, etag)
+    if auctions is None:
+        # Unchanged since the last download: the stored snapshot is current again
+        with transaction() as conn:
+            conn.execute("UPDATE auction_meta SET ts = ? WHERE realm = ?", (time.time(), realm_id))
+        return get_cached_auctions(realm_id)
+    lowest = lowest_buyouts(auctions)
+
+    with transaction() as conn:
+        # The new snapshot is the source of truth, but only rows that differ are written:
+        # changed prices are updated, unchanged ones left alone
+        conn.executemany(
+            "INSERT INTO auction_prices (realm, item, buyout) VALUES (?, ?, ?) "
+            "ON CONFLICT (realm, item) DO UPDATE SET buyout = excluded.buyout "
+            "WHERE buyout IS NOT excluded.buyout",
+            [(realm_id, item, buyout) for item, buyout in lowest.items()]
+        )
+        # ...and items no longer listed are dropped, via the snapshot's keys staged in memory
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS snapshot_items (item INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM snapshot_items")
+        conn.executemany("INSERT INTO snapshot_items (item) VALUES (?)", ((item,) for item in lowest))
+        conn.execute(
+            "DELETE FROM auction_prices WHERE realm = ? AND item NOT IN (SELECT item FROM snapshot_items)",
+            (realm_id,)
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO auction_meta (realm, ts, lm, etag) VALUES (?, ?, ?, ?)",
+            (realm_id, time.time(), last_modified, etag)
+        )
+    return get_cached_auctions(realm_id)
+
+
+def cache_selected_realms_auctions(executor=None):
+    """
+    Cache auctions for all realms currently selected in manage_realms_csv, in parallel
+    on a bounded worker pool sharing the pooled Blizzard session.
+    Pass `executor` to run on a caller-owned pool (e.g. one the GUI can cancel on
+    exit); otherwise a REALM_WORKERS pool is used for the duration of the call.
     Returns a dict mapping realm_id to its cached auction dict.
     """
+    # Imported here: manage_realms_csv pulls in tkinter, which headless callers don't need
+    from manage_realms_csv import load_selected_realms
     realms = load_selected_realms()
-    results = {}
-    threads = []
-
-    def worker(rid):
-        results[rid] = cache_realm_auctions(rid)
-
-    for rid in realms:
-        t = threading.Thread(target=worker, args=(rid,), daemon=True)
-        t.start()
-        threads.append(t)
-    for t in threads:
-        t.join()
-    return results
+    if executor is not None:
+        return dict(zip(realms, executor.map(cache_realm_auctions, realms)))
+    with ThreadPoolExecutor(max_workers=REALM_WORKERS) as pool:
+        return dict(zip(realms, pool.map(cache_realm_auctions, realms)))
 
 
 def get_cached_auctions(realm_id):
     """
     Get the entire cached auction dict (item_id->buyout) for a realm.
     """
-    key = str(realm_id)
-    with shelve.open(AUCTION_CACHE) as db:
-        return db.get(key, {})
+    _ensure_tables()
+    rows = query("SELECT item, buyout FROM auction_prices WHERE realm = ?", (int(realm_id),))
+    return {str(item): buyout for item, buyout in rows}
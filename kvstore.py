@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+import atexit
+import os
+import pickle
+import shelve
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Single SQLite database backing every local cache
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+DB_PATH   = os.path.join(CACHE_DIR, "servana.db")
+
+_conn = None
+_lock = threading.RLock()
+
+
+def connect():
+    """
+    Return the process-wide SQLite connection, opening it in WAL mode on first use.
+    """
+    global _conn
+    with _lock:
+        if _conn is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+            conn.execute("PRAGMA temp_store=MEMORY")
+            _conn = conn
+            atexit.register(close)
+        return _conn
+
+
+def close():
+    """
+    Close the shared connection (checkpointing the WAL); registered with atexit.
+    """
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+@contextmanager
+def transaction():
+    """
+    Run a block of statements as one transaction (one commit, one WAL sync).
+    """
+    conn = connect()
+    with _lock:
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def query(sql, params=()):
+    """
+    Run a read statement on the shared connection and return all rows.
+    """
+    with _lock:
+        return connect().execute(sql, params).fetchall()
+
+
+def legacy_items(path):
+    """
+    Yield (key, value) pairs from an old shelve file, or nothing if it is unreadable.
+    """
+    try:
+        with shelve.open(path, flag="r") as db:
+            yield from db.items()
+        return
+    except Exception:
+        pass
+    # Shelves written by Python 3.13+ are SQLite files the older dbm modules can't detect
+    if not os.path.isfile(path):
+        return
+    try:
+        src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        rows = src.execute("SELECT key, value FROM Dict").fetchall()
+        src.close()
+    except sqlite3.Error:
+        return
+    for key, value in rows:
+        if isinstance(key, bytes):
+            key = key.decode("utf-8")
+        yield key, pickle.loads(value)
+
+
+class KV:
+    """
+    Dict-like key/value table (str keys, pickled values) replacing a shelve file.
+    If `legacy` names an existing shelf, its contents are imported when the
+    table is first created. With `ttl` (seconds), get() and `in` treat entries
+    older than that as missing. The `memo` most recently used entries are also
+    kept in memory, so repeat lookups skip SQLite and unpickling.
+    """
+
+    def __init__(self, table, legacy=None, ttl=None, memo=4096):
+        self.table = table
+        self.legacy = legacy
+        self.ttl = ttl
+        self._ready = False
+        self._memo = OrderedDict()  # key -> (value, write time), in LRU order
+        self._memo_size = memo
+        self._memo_lock = threading.Lock()
+
+    def _db(self):
+        if not self._ready:
+            conn = connect()
+            with _lock:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (self.table,)
+                ).fetchone()
+                if not exists:
+                    with transaction():
+                        conn.execute(
+                            f"CREATE TABLE {self.table}"
+                            " (k TEXT PRIMARY KEY, v BLOB NOT NULL, ts REAL NOT NULL DEFAULT 0)"
+                        )
+                        if self.legacy:
+                            conn.executemany(
+                                f"INSERT OR REPLACE INTO {self.table} (k, v) VALUES (?, ?)",
+                                ((k, pickle.dumps(v)) for k, v in legacy_items(self.legacy))
+                            )
+                else:
+                    cols = [row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")]
+                    if "ts" not in cols:
+                        # Tables created before write times were tracked
+                        conn.execute(f"ALTER TABLE {self.table} ADD COLUMN ts REAL NOT NULL DEFAULT 0")
+                self._ready = True
+        return connect()
+
+    def _fresh(self):
+        """SQL filter + params excluding entries older than ttl."""
+        if self.ttl is None:
+            return "", ()
+        return " AND ts >= ?", (time.time() - self.ttl,)
+
+    def _remember(self, key, value, ts):
+        with self._memo_lock:
+            self._memo[key] = (value, ts)
+            self._memo.move_to_end(key)
+            if len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+
+    def _recall(self, key):
+        """Return the memoized (value, ts) for key if it is still fresh, else None."""
+        with self._memo_lock:
+            hit = self._memo.get(key)
+            if hit is not None:
+                self._memo.move_to_end(key)
+        if hit is not None and (self.ttl is None or hit[1] >= time.time() - self.ttl):
+            return hit
+        return None
+
+    def get(self, key, default=None):
+        hit = self._recall(key)
+        if hit is not None:
+            return hit[0]
+        where, params = self._fresh()
+        with _lock:
+            row = self._db().execute(
+                f"SELECT v, ts FROM {self.table} WHERE k = ?{where}", (key, *params)
+            ).fetchone()
+        if row is None:
+            return default
+        value = pickle.loads(row[0])
+        self._remember(key, value, row[1])
+        return value
+
+    def __getitem__(self, key):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        if self._recall(key) is not None:
+            return True
+        where, params = self._fresh()
+        with _lock:
+            return self._db().execute(
+                f"SELECT 1 FROM {self.table} WHERE k = ?{where}", (key, *params)
+            ).fetchone() is not None
+
+    def __setitem__(self, key, value):
+        now = time.time()
+        with _lock:
+            self._db().execute(
+                f"INSERT OR REPLACE INTO {self.table} (k, v, ts) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value), now)
+            )
+        self._remember(key, value, now)
+
+    def update(self, mapping):
+        """Write many entries in a single transaction."""
+        mapping = dict(mapping)
+        now = time.time()
+        rows = [(k, pickle.dumps(v), now) for k, v in mapping.items()]
+        self._db()
+        with transaction() as conn:
+            conn.executemany(f"INSERT OR REPLACE INTO {self.table} (k, v, ts) VALUES (?, ?, ?)", rows)
+        for k, v in mapping.items():
+            self._remember(k, v, now)
+
+    def keys(self):
+        with _lock:
+            return [k for (k,) in self._db().execute(f"SELECT k FROM {self.table}")]
+
+    def items(self):
+        with _lock:
+            rows = self._db().execute(f"SELECT k, v FROM {self.table}").fetchall()
+        return [(k, pickle.loads(v)) for k, v in rows]
+
+    def __len__(self):
+        with _lock:
+            return self._db().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
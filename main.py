@@ -3,8 +3,10 @@ from ui import ServanaApp
 
 import sys
 
-# only do this on Win when running as a .exe or from python.exe
-if sys.platform.startswith("win"):
+# only do this on Win when running as a .exe or from python.exe, and only
+# when there is a console to detach (pythonw / windowed builds have no
+# stdout), so ctypes stays off the cold-start path otherwise
+if sys.platform.startswith("win") and sys.stdout is not None and sys.stdout.isatty():
     try:
         import ctypes
         # detach this process from its console
@@ -1,40 +1,65 @@
 #!/usr/bin/env python3
 import os
 import csv
-import shelve
+from functools import lru_cache
 import tkinter as tk
 from tkinter import ttk, messagebox
+from kvstore import KV
 
 CACHE_DIR   = os.path.join(os.path.dirname(__file__), ".cache")
 REALMS_CSV  = os.path.join(CACHE_DIR, "realms.csv")
 SETTINGS_DB = os.path.join(CACHE_DIR, "realms_settings.db")
 
+# Per-realm enabled flags (imported from the SETTINGS_DB shelf on first use)
+SETTINGS = KV("realm_settings", legacy=SETTINGS_DB)
+
+@lru_cache(maxsize=4)
+def _parse_csv(path, mtime):
+    """
+    Parse the realms CSV into {realm_id: realm_name}.
+    Memoized on (path, mtime), so the file is only re-read after it changes.
+    """
+    realms = {}
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            if len(row) == 1 and ":" in row[0]:
+                rid, name = row[0].split(":", 1)
+            else:
+                rid, name = row[0], row[1]
+            try:
+                realms[int(rid)] = name.strip()
+            except ValueError:
+                continue
+    return realms
+
+
+def load_all_realms():
+    """
+    Return a fresh {realm_id: realm_name} dict for every realm in REALMS_CSV.
+    """
+    if not os.path.isfile(REALMS_CSV):
+        return {}
+    return dict(_parse_csv(REALMS_CSV, os.path.getmtime(REALMS_CSV)))
+
+
+def load_flags(realm_ids):
+    """
+    Return {realm_id: enabled} for the given realms (default True),
+    reading SETTINGS in a single query.
+    """
+    saved = dict(SETTINGS.items())
+    return {rid: saved.get(str(rid), True) for rid in realm_ids}
+
+
 def load_selected_realms():
     """
     Return {realm_id: realm_name} for realms with enabled=True in SETTINGS_DB.
     """
-    realms = {}
-    if os.path.isfile(REALMS_CSV):
-        with open(REALMS_CSV, newline='') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if not row:
-                    continue
-                if len(row) == 1 and ":" in row[0]:
-                    rid, name = row[0].split(":", 1)
-                else:
-                    rid, name = row[0], row[1]
-                try:
-                    realms[int(rid)] = name.strip()
-                except ValueError:
-                    continue
-
-    enabled = {}
-    with shelve.open(SETTINGS_DB) as db:
-        for rid, name in realms.items():
-            if db.get(str(rid), True):
-                enabled[rid] = name
-    return enabled
+    realms = load_all_realms()
+    flags = load_flags(realms)
+    return {rid: name for rid, name in realms.items() if flags[rid]}
 
 
 class RealmManager(tk.Toplevel):
@@ -44,27 +69,9 @@ class RealmManager(tk.Toplevel):
         self.configure(bg="#2e2e2e")
         self.resizable(True, True)
 
-        # Load all realms and their saved flags
-        self.all_realms = {}
-        if os.path.isfile(REALMS_CSV):
-            with open(REALMS_CSV, newline='') as f:
-                for row in csv.reader(f):
-                    if not row:
-                        continue
-                    if len(row) == 1 and ":" in row[0]:
-                        rid, name = row[0].split(":",1)
-                    else:
-                        rid, name = row[0], row[1]
-                    try:
-                        self.all_realms[int(rid)] = name.strip()
-                    except ValueError:
-                        continue
-
-        # Load persisted flags (default True)
-        self.flags = {}
-        with shelve.open(SETTINGS_DB) as db:
-            for rid in self.all_realms:
-                self.flags[rid] = db.get(str(rid), True)
+        # Load all realms and their saved flags (default True)
+        self.all_realms = load_all_realms()
+        self.flags = load_flags(self.all_realms)
 
         # Build UI
         frm = ttk.Frame(self, padding=10)
@@ -77,7 +84,7 @@ class RealmManager(tk.Toplevel):
         self.search_var = tk.StringVar()
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         search_entry.pack(side="left", fill="x", expand=True, padx=(5,0))
-        self.search_var.trace_add('write', lambda *args: self._populate_tree())
+        self.search_var.trace_add('write', lambda *args: self._filter())
 
         # --- Treeview ---
         cols = ("Enabled", "Realm")
@@ -105,36 +112,45 @@ class RealmManager(tk.Toplevel):
         self._populate_tree()
 
     def _populate_tree(self):
-        """Clear & repopulate tree based on search filter."""
-        q = self.search_var.get().lower()
-        self.tv.delete(*self.tv.get_children())
-
-        for rid, name in sorted(self.all_realms.items(), key=lambda x: x[1].lower()):
-            if q and q not in name.lower() and q not in str(rid):
-                continue
+        """Insert every realm row once, sorted by name; _filter() then hides/shows rows."""
+        # (iid, lowercase name) in display order, built once so filtering never calls .lower()
+        self._search_index = sorted(
+            ((str(rid), name.lower()) for rid, name in self.all_realms.items()),
+            key=lambda x: x[1]
+        )
+        for iid, _ in self._search_index:
+            rid = int(iid)
+            name = self.all_realms[rid]
             enabled = self.flags[rid]
-            tag = "on" if enabled else "off"
             self.tv.insert(
                 "", "end",
-                iid=str(rid),
+                iid=iid,
                 values=("✓" if enabled else "", f"{name} : {rid}"),
-                tags=(tag,)
+                tags=("on" if enabled else "off",)
             )
 
+    def _filter(self):
+        """Detach rows that don't match the search and reattach the rest, in name order."""
+        q = self.search_var.get().lower()
+        for iid, lname in self._search_index:
+            if not q or q in lname or q in iid:
+                self.tv.reattach(iid, "", "end")
+            else:
+                self.tv.detach(iid)
+
     def _on_toggle(self, event):
         """Flip the enabled flag for the clicked row."""
         row = self.tv.identify_row(event.y)
         if not row:
             return
         rid = int(row)
-        self.flags[rid] = not self.flags[rid]
-        # update visual
-        self._populate_tree()
+        enabled = self.flags[rid] = not self.flags[rid]
+        # update just this row
+        self.tv.item(row, values=("✓" if enabled else "", f"{self.all_realms[rid]} : {rid}"),
+                     tags=("on" if enabled else "off",))
 
     def _save(self):
-        """Persist all flags and close."""
-        with shelve.open(SETTINGS_DB, writeback=True) as db:
-            for rid, val in self.flags.items():
-                db[str(rid)] = val
+        """Persist all flags in one transaction and close."""
+        SETTINGS.update({str(rid): val for rid, val in self.flags.items()})
         messagebox.showinfo("Saved", "Realm settings updated.")
         self.destroy()
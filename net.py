@@ -0,0 +1,125 @@
+# --- net.py ---
+import json
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = orjson.dumps
+except ImportError:  # stdlib fallback; json.loads accepts bytes too
+    loads = json.loads
+
+    def dumps(obj):
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+USER_AGENT = "Servana/1.0"
+
+# Default (connect, read) timeout in seconds; the read timeout applies per
+# socket read, so streamed auction dumps aren't cut off, only stalled ones
+TIMEOUT = (5, 30)
+
+
+class TimeoutSession(requests.Session):
+    """
+    Session that applies TIMEOUT to every request that doesn't set its own,
+    so a hung endpoint raises instead of blocking a worker forever.
+    """
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", TIMEOUT)
+        return super().request(*args, **kwargs)
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter: `rate` requests per second with
+    bursts of up to `capacity`. acquire() only sleeps when the bucket is empty.
+    """
+
+    def __init__(self, rate=90, capacity=100):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + self.rate * (now - self.last))
+            self.last = now
+            self.tokens -= 1
+            # Negative balance = time this caller must wait for its token
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class RateLimitedSession(TimeoutSession):
+    """
+    Session that takes a token from `bucket` before every request.
+    """
+
+    def __init__(self, bucket):
+        super().__init__()
+        self.bucket = bucket
+
+    def request(self, *args, **kwargs):
+        self.bucket.acquire()
+        return super().request(*args, **kwargs)
+
+
+def new_session(bucket=None):
+    """
+    Build a keep-alive Session with pooled connections, retries on 429/5xx and
+    the default TIMEOUT, throttled by `bucket` if one is given.
+    """
+    session = RateLimitedSession(bucket) if bucket else TimeoutSession()
+    session.headers["User-Agent"] = USER_AGENT
+    session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=_retry()))
+    return session
+
+
+def _retry():
+    """
+    Exponential backoff (0.5s, 1s, 2s, ... capped at 30s) with random jitter on
+    429/5xx, honouring Retry-After. Token POSTs are retried too. When retries run
+    out the last response is returned, so callers still see a normal HTTPError.
+    """
+    kwargs = dict(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=1.0, backoff_max=30, **kwargs)
+    except TypeError:  # urllib3 < 2 has no jitter/max knobs
+        return Retry(**kwargs)
+
+
+# One session per API so each keeps its own bearer token in `headers`, and
+# one bucket per API so concurrent fetchers share that API's budget.
+# Blizzard allows 100 req/s per client; stay just under it. TSM publishes no
+# per-second cap, so pace it conservatively.
+BLIZZ_BUCKET  = TokenBucket(rate=90, capacity=100)
+TSM_BUCKET    = TokenBucket(rate=20, capacity=20)
+BLIZZ_SESSION = new_session(BLIZZ_BUCKET)
+TSM_SESSION   = new_session(TSM_BUCKET)
+# Unauthenticated, unthrottled session for icon downloads from the render CDN
+MEDIA_SESSION = new_session()
+
+
+def parse_json(resp):
+    """
+    Decode a response body with the fastest available parser
+    (skips requests' charset detection by working on the raw bytes).
+    """
+    return loads(resp.content)
@@ -8,7 +8,11 @@ Writes ./connected_realms.csv with columns:
 import os
 import time
 import csv
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 # --- CONFIG ---
@@ -17,7 +21,17 @@ NAMESPACE   = f"dynamic-{REGION}"
 LOCALE      = "en_US"
 OUTPUT_CSV  = "connected_realms.csv"
 MAX_ID      = 5000        # bump this ceiling if needed
-DELAY       = 0.1         # seconds between requests to be polite
+WORKERS     = 16          # concurrent lookups (almost all IDs 404, so this is RTT-bound)
+RATE        = 90          # requests per second, under Blizzard's 100/s client cap
+
+TIMEOUT     = (5, 30)     # (connect, read) seconds
+
+# Shared keep-alive session: one pooled connection per worker, retries on 429/5xx
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_maxsize=WORKERS, max_retries=Retry(
+    total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"}, raise_on_status=False
+)))
 
 # OAuth
 load_dotenv()
@@ -28,49 +42,78 @@ if not CLIENT_ID or not CLIENT_SECRET:
 
 _token      = None
 _token_exp  = 0
+_token_lock = threading.Lock()
+
+# Shared pacing across workers: each request claims the next 1/RATE time slot
+_next_slot  = 0.0
+_slot_lock  = threading.Lock()
+
+def throttle():
+    global _next_slot
+    with _slot_lock:
+        now = time.monotonic()
+        wait = _next_slot - now
+        _next_slot = max(now, _next_slot) + 1 / RATE
+    if wait > 0:
+        time.sleep(wait)
+
 def get_token():
     global _token, _token_exp
-    now = time.time()
-    if _token and now < _token_exp:
+    with _token_lock:
+        now = time.time()
+        if _token and now < _token_exp:
+            return _token
+        resp = SESSION.post(
+            f"https://{REGION}.battle.net/oauth/token",
+            auth=(CLIENT_ID, CLIENT_SECRET),
+            data={"grant_type":"client_credentials"},
+            timeout=TIMEOUT
+        )
+        resp.raise_for_status()
+        j = resp.json()
+        _token     = j["access_token"]
+        _token_exp = now + j.get("expires_in",1800) - 60
         return _token
-    resp = requests.post(
-        f"https://{REGION}.battle.net/oauth/token",
-        auth=(CLIENT_ID, CLIENT_SECRET),
-        data={"grant_type":"client_credentials"}
-    )
-    resp.raise_for_status()
-    j = resp.json()
-    _token     = j["access_token"]
-    _token_exp = now + j.get("expires_in",1800) - 60
-    return _token
+
+def fetch_realms(url_tpl, cr_id):
+    """
+    Return (cr_id, realms) for one connected-realm ID; realms is None if it doesn't exist.
+    """
+    throttle()
+    token = get_token()
+    r = SESSION.get(url_tpl.format(cr_id=cr_id), headers={"Authorization":f"Bearer {token}"}, timeout=TIMEOUT)
+    if r.status_code == 404:
+        return cr_id, None
+    r.raise_for_status()
+    return cr_id, r.json().get("realms", [])
 
 # Main
 def main():
     url_tpl = (
         f"https://{REGION}.api.blizzard.com/data/wow/connected-realm/"
-        "{{cr_id}}?namespace=" + NAMESPACE + "&locale=" + LOCALE
+        "{cr_id}?namespace=" + NAMESPACE + "&locale=" + LOCALE
     )
 
-    with open(OUTPUT_CSV, "w", newline="", encoding="utf-8") as fh:
+    # 1 MiB write buffer: rows are small, so let them accumulate between flushes
+    with open(OUTPUT_CSV, "w", newline="", encoding="utf-8", buffering=1 << 20) as fh, \
+         ThreadPoolExecutor(max_workers=WORKERS) as pool:
         writer = csv.writer(fh)
         writer.writerow(["connected_realm_id", "realm_id", "realm_name"])
 
-        for cr_id in range(1, MAX_ID+1):
-            time.sleep(DELAY)
-            token = get_token()
-            url = url_tpl.format(cr_id=cr_id)
-            r = requests.get(url, headers={"Authorization":f"Bearer {token}"})
-            if r.status_code == 404:
-                continue
+        # Rows are written here on the main thread as lookups finish
+        futures = {pool.submit(fetch_realms, url_tpl, cr_id): cr_id for cr_id in range(1, MAX_ID+1)}
+        for fut in as_completed(futures):
             try:
-                r.raise_for_status()
-                data = r.json()
-                for realm in data.get("realms", []):
-                    writer.writerow([cr_id, realm["id"], realm.get("name","")])
-                print(f"OK: connected-realm {cr_id} → {len(data.get('realms',[]))} realms")
+                cr_id, realms = fut.result()
             except Exception as e:
                 # skip any other error
-                print(f"Skipping {cr_id}: {e}")
+                print(f"Skipping {futures[fut]}: {e}")
+                continue
+            if realms is None:
+                continue
+            for realm in realms:
+                writer.writerow([cr_id, realm["id"], realm.get("name","")])
+            print(f"OK: connected-realm {cr_id} → {len(realms)} realms")
 
     print(f"Done. See {OUTPUT_CSV}")
 
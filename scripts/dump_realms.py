@@ -17,8 +17,22 @@ import sys
 import time
 import csv
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+# Concurrent detail lookups (one request per connected realm)
+WORKERS = 8
+
+# Shared keep-alive session
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_maxsize=WORKERS, max_retries=Retry(
+    total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"}, raise_on_status=False
+)))
+TIMEOUT = (5, 30)  # (connect, read) seconds
+
 # Load credentials
 load_dotenv()
 CLIENT_ID = os.getenv('BLIZZARD_CLIENT_ID')
@@ -41,10 +55,11 @@ def get_access_token():
     now = time.time()
     if _token and now < _token_expires - 60:
         return _token
-    resp = requests.post(
+    resp = SESSION.post(
         TOKEN_URL,
         data={'grant_type': 'client_credentials'},
-        auth=(CLIENT_ID, CLIENT_SECRET)
+        auth=(CLIENT_ID, CLIENT_SECRET),
+        timeout=TIMEOUT
     )
     resp.raise_for_status()
     data = resp.json()
@@ -58,7 +73,7 @@ def fetch_index():
     token = get_access_token()
     params = {'namespace': NAMESPACE, 'locale': LOCALE}
     headers = {'Authorization': f'Bearer {token}'}
-    resp = requests.get(INDEX_URL, params=params, headers=headers)
+    resp = SESSION.get(INDEX_URL, params=params, headers=headers, timeout=TIMEOUT)
     resp.raise_for_status()
     return resp.json().get('connected_realms', [])
 
@@ -69,11 +84,41 @@ def fetch_detail(realm_id):
     url = DETAIL_URL.format(realm_id)
     params = {'namespace': NAMESPACE, 'locale': LOCALE}
     headers = {'Authorization': f'Bearer {token}'}
-    resp = requests.get(url, params=params, headers=headers)
+    resp = SESSION.get(url, params=params, headers=headers, timeout=TIMEOUT)
     resp.raise_for_status()
     return resp.json()
 
 
+def fetch_names(entry):
+    """
+    Return (realm_id, member realm names) for an index entry,
+    or (realm_id, None) if its details couldn't be fetched.
+    """
+    href = entry.get('key', {}).get('href') or entry.get('href', '')
+    realm_id = href.rstrip('/').split('/')[-1].split('?')[0]
+
+    # Fetch full detail to get realm names
+    try:
+        detail = fetch_detail(realm_id)
+    except Exception as e:
+        print(f"Error fetching details for {realm_id}: {e}")
+        return realm_id, None
+
+    # Extract member realm names, handling both dict and string cases
+    realms = detail.get('realms', [])
+    names = []
+    for r in realms:
+        if isinstance(r, dict):
+            name_val = r.get('name')
+            if isinstance(name_val, dict):
+                names.append(name_val.get(LOCALE, ''))
+            else:
+                names.append(str(name_val))
+        else:
+            names.append(str(r))
+    return realm_id, names
+
+
 def main():
     if not CLIENT_ID or not CLIENT_SECRET:
         sys.exit('Please set BLIZZARD_CLIENT_ID and BLIZZARD_CLIENT_SECRET in .env')
@@ -82,35 +127,16 @@ def main():
     csv_file = 'connected_realms.csv'
     print(f"Writing {len(entries)} connected realms to {csv_file}...")
 
-    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+    # The token is cached by fetch_index, so workers share it; map keeps index order
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        rows = [(realm_id, ','.join(names))
+                for realm_id, names in pool.map(fetch_names, entries) if names is not None]
+
+    # Written in one go once the network phase is done
+    with open(csv_file, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
         writer = csv.writer(f)
         writer.writerow(['connected_realm_id', 'realm_names'])
-
-        for entry in entries:
-            href = entry.get('key', {}).get('href') or entry.get('href', '')
-            realm_id = href.rstrip('/').split('/')[-1].split('?')[0]
-
-            # Fetch full detail to get realm names
-            try:
-                detail = fetch_detail(realm_id)
-            except Exception as e:
-                print(f"Error fetching details for {realm_id}: {e}")
-                continue
-
-            # Extract member realm names, handling both dict and string cases
-            realms = detail.get('realms', [])
-            names = []
-            for r in realms:
-                if isinstance(r, dict):
-                    name_val = r.get('name')
-                    if isinstance(name_val, dict):
-                        names.append(name_val.get(LOCALE, ''))
-                    else:
-                        names.append(str(name_val))
-                else:
-                    names.append(str(r))
-
-            writer.writerow([realm_id, ','.join(names)])
+        writer.writerows(rows)
 
     print("CSV export complete.")
 
@@ -11,8 +11,23 @@ import time
 import argparse
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Shared keep-alive session
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"}, raise_on_status=False
+)))
+TIMEOUT = (5, 30)  # (connect, read) seconds
+
 # Blizzard OAuth & API endpoints
 TOKEN_URL = "https://us.battle.net/oauth/token"
 BASE_API  = "https://us.api.blizzard.com/data/wow"
@@ -28,10 +43,11 @@ def fetch_token(client_id: str, client_secret: str) -> None:
     """
     global _cached_token, _token_expiry
 
-    resp = requests.post(
+    resp = SESSION.post(
         TOKEN_URL,
         data={"grant_type": "client_credentials"},
-        auth=(client_id, client_secret)
+        auth=(client_id, client_secret),
+        timeout=TIMEOUT
     )
     resp.raise_for_status()
     data = resp.json()
@@ -58,9 +74,10 @@ def get_raw_auctions(realm_id: int, client_id: str, client_secret: str) -> dict:
     headers = {"Authorization": f"Bearer {token}"}
     params  = {"namespace": "dynamic-us", "locale": "en_US"}
 
-    resp = requests.get(url, headers=headers, params=params)
+    resp = SESSION.get(url, headers=headers, params=params, timeout=TIMEOUT)
     resp.raise_for_status()
-    return resp.json()
+    # Parse the raw bytes directly; orjson is several times faster on this payload
+    return orjson.loads(resp.content) if orjson else json.loads(resp.content)
 
 
 def write_raw_json(data: dict, realm_id: int) -> None:
@@ -87,7 +87,7 @@ class RealmManager(tk.Toplevel):
         rid = int(item)
         new_state = not self.settings.get(rid, True)
         self.settings[rid] = new_state
-        with shelve.open(SETTINGS_DB, writeback=True) as db:
+        with shelve.open(SETTINGS_DB) as db:
             db[str(rid)] = new_state
         # Refresh tag only (no Enabled column)
         tag = 'enabled' if new_state else 'disabled'
@@ -1,24 +1,48 @@
 #!/usr/bin/env python3
 import threading
 import io
-import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
-import shelve
 
 from utils import _load_icon, format_price
 from api import (
     get_tsm_region_stats,
     get_blizzard_name,
-    get_blizzard_pic,
-    NAME_CACHE,
+    get_item_icon,
+    NAME_DB
+)
+from cache import (
+    get_cached_price,
+    get_fresh_prices,
+    get_realm_price,
     cache_selected_realms_auctions,
-    cache_realm_auctions
+    REALM_WORKERS
 )
-from cache import get_cached_price
 from manage_realms_csv import RealmManager, load_selected_realms
 
+# Shared pool for blocking network lookups; query/fill driver threads submit
+# to it and hand results back to Tk with root.after
+EXECUTOR = ThreadPoolExecutor(max_workers=max(16, REALM_WORKERS))
+# Fill Cache's realm downloads, kept separate so they stay at REALM_WORKERS
+FILL_EXECUTOR = ThreadPoolExecutor(max_workers=REALM_WORKERS)
+
+# Resized item icons kept per session, oldest evicted first
+ICON_CACHE_SIZE = 128
+
+# Quiet period before the cache list refilters after a keystroke
+SEARCH_DEBOUNCE_MS = 120
+
+def _result(fut, default):
+    """Return fut.result(), or `default` (after logging) if the lookup raised."""
+    try:
+        return fut.result()
+    except Exception as e:
+        print(f"Lookup failed: {e}")
+        return default
+
 class ServanaApp:
     def __init__(self):
         self.root = tk.Tk()
@@ -26,8 +50,16 @@ class ServanaApp:
         self.root.configure(bg="#1e1e1e")
         self.root.resizable(True, True)
         self.root.wm_aspect(16, 9, 16, 9)
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         # Track cache-panel build state
         self.cache_built = False
+        # Bumped per query so results from a superseded query are dropped
+        self._query_seq = 0
+        # Set once the window is closing; worker threads stop posting to Tk
+        self._closing = False
+        self._icons = OrderedDict()  # item_id -> ICON_SIZE PhotoImage
+        self._sort_keys = {}  # tree iid -> {column: raw sort value or None}
+        self._sort_desc = {}  # column -> direction of its next sort (ascending first)
         self._build_ui()
 
     def _build_ui(self):
@@ -92,7 +124,7 @@ class ServanaApp:
             image=self.search_img,
             width=32, height=32,
             bd=0, bg="#1e1e1e", activebackground="#1e1e1e",
-            command=lambda: threading.Thread(target=self._run_query, daemon=True).start()
+            command=self._start_query
         ).pack(side="left")
 
         # Item info panel
@@ -132,7 +164,7 @@ class ServanaApp:
         style.configure("Custom.Treeview.Heading", background="#1e1e1e", foreground="#ffffff")
         self.tree = ttk.Treeview(self.main, style="Custom.Treeview", columns=cols, show="headings")
         for c, w in zip(cols, widths):
-            self.tree.heading(c, text=c, command=lambda c=c: self._sort_column(c, False))
+            self.tree.heading(c, text=c, command=lambda c=c: self._toggle_sort(c))
             self.tree.column(c, width=w, anchor="center")
         self.tree.tag_configure("overpriced", foreground="red")
         self.tree.tag_configure("undercut",   foreground="green")
@@ -155,29 +187,50 @@ class ServanaApp:
         self.cache_listbox = tk.Listbox(self.cache_frame, bg="#2e2e2e", fg="#dddddd")
         self.cache_listbox.pack(fill='both', expand=True, padx=5, pady=5)
 
-        items = []
-        with shelve.open(NAME_CACHE) as db:
-            items.extend((k, v) for k, v in db.items())
+        items = NAME_DB.items()
         items.sort(key=lambda x: int(x[0]))
 
+        # (row text, "id\nname" lowercased, id) built once, so keystrokes never call .lower() per item
+        index = [(f"{k} - {n}", f"{k}\n{n.lower()}", k) for k, n in items]
+        last = {"q": None, "matches": index}
+
         def update_list(*args):
-            self.cache_listbox.delete(0, 'end')
             q = self.cache_search_var.get().lower()
-            for k, n in items:
-                if q in n.lower() or q in k:
-                    self.cache_listbox.insert('end', f"{k} - {n}")
+            if q == last["q"]:
+                return
+            # typing further characters can only narrow the previous matches
+            pool = last["matches"] if last["q"] is not None and q.startswith(last["q"]) else index
+            matches = [row for row in pool if q in row[1]]
+            last.update(q=q, matches=matches)
+            self.cache_listbox.delete(0, 'end')
+            # one variadic insert = one Tcl round-trip for the whole result set
+            self.cache_listbox.insert('end', *(row[0] for row in matches))
 
-        self.cache_search_var.trace_add('write', update_list)
+        pending = {"id": None}
+
+        def schedule_update(*args):
+            # Debounce: refilter once typing pauses rather than on every keystroke
+            if pending["id"] is not None:
+                self.root.after_cancel(pending["id"])
+            pending["id"] = self.root.after(SEARCH_DEBOUNCE_MS, run_update)
+
+        def run_update():
+            pending["id"] = None
+            update_list()
+
+        self.cache_search_var.trace_add('write', schedule_update)
         update_list()
 
-        self.cache_listbox.bind(
-            '<Double-1>',
-            lambda e: (
-                self.entry.delete(0, 'end'),
-                self.entry.insert(0, self.cache_listbox.get(self.cache_listbox.curselection()).split(' - ',1)[0]),
-                self._toggle_cache()
-            )
-        )
+        def on_pick(event):
+            sel = self.cache_listbox.curselection()
+            if not sel:
+                return
+            # Listbox rows line up with the current matches, so the ID is an index away
+            self.entry.delete(0, 'end')
+            self.entry.insert(0, last["matches"][sel[0]][2])
+            self._toggle_cache()
+
+        self.cache_listbox.bind('<Double-1>', on_pick)
 
     def _toggle_cache(self):
         # Build panel once
@@ -203,22 +256,35 @@ class ServanaApp:
 
     def _fill_cache(self):
         try:
-            cache_selected_realms_auctions()
-            messagebox.showinfo("Cache Complete", "Realm auctions have been cached.")
+            cache_selected_realms_auctions(FILL_EXECUTOR)
+            msg = (messagebox.showinfo, "Cache Complete", "Realm auctions have been cached.")
         except Exception as e:
-            messagebox.showerror("Cache Error", str(e))
+            msg = (messagebox.showerror, "Cache Error", str(e))
+        if self._closing:
+            return
+        try:
+            self.root.after(0, *msg)
+        except (RuntimeError, tk.TclError):
+            pass  # window closed meanwhile
 
     def _sort_column(self, col, reverse):
-        data = [(self.tree.set(k, col), k) for k in self.tree.get_children('')]
-        try:
-            data.sort(key=lambda t: float(t[0].strip('gsc%+–—')), reverse=reverse)
-        except:
-            data.sort(key=lambda t: t[0], reverse=reverse)
-        for i, (_, k) in enumerate(data):
+        # Sort on the raw values recorded at insert time; rows without one ("—") stay last
+        keys = self._sort_keys
+        rows = self.tree.get_children('')
+        present = [k for k in rows if keys[k][col] is not None]
+        present.sort(key=lambda k: keys[k][col], reverse=reverse)
+        missing = [k for k in rows if keys[k][col] is None]
+        for i, k in enumerate(present + missing):
             self.tree.move(k, '', i)
-        self.tree.heading(col, command=lambda: self._sort_column(col, not reverse))
 
-    def _run_query(self):
+    def _toggle_sort(self, col):
+        # Heading commands are bound once; each click flips that column's direction
+        reverse = self._sort_desc.get(col, False)
+        self._sort_desc[col] = not reverse
+        self._sort_column(col, reverse)
+
+    def _start_query(self):
+        """Validate the entry on the Tk thread, then run the lookup on a worker."""
         text = self.entry.get().strip()
         try:
             item_id = int(text)
@@ -226,54 +292,128 @@ class ServanaApp:
             messagebox.showerror("Error", "Enter a valid item ID.")
             return
         self.tree.delete(*self.tree.get_children())
-        # fetch item info
-        name = get_blizzard_name(item_id)
-        pic = get_blizzard_pic(item_id)
-        if pic:
-            data = requests.get(pic).content
-            img = ImageTk.PhotoImage(
-                Image.open(io.BytesIO(data)).resize((48,48), Image.LANCZOS)
-            )
+        self._sort_keys.clear()
+        self._query_seq += 1
+        # _icons belongs to the Tk thread, so check it here rather than from a worker
+        have_icon = item_id in self._icons
+        threading.Thread(
+            target=self._run_query, args=(item_id, self._query_seq, have_icon), daemon=True
+        ).start()
+
+    def _post(self, seq, fn, *args):
+        """Schedule fn(*args) on the Tk thread, unless a newer query has started by then."""
+        def apply():
+            if seq == self._query_seq:
+                fn(*args)
+        if self._closing:
+            return
+        try:
+            self.root.after(0, apply)
+        except (RuntimeError, tk.TclError):
+            pass  # root destroyed while this worker was still running
+
+    def _run_query(self, item_id, seq, have_icon=False):
+        """
+        Worker thread: fetch item info and every selected realm's price
+        concurrently. Widget updates are handed back to the Tk thread via root.after.
+        `have_icon` means the Tk thread already holds this item's PhotoImage.
+        """
+        def fetch_icon():
+            # the Tk thread already holds a resized copy; skip the bytes entirely
+            return None if have_icon else get_item_icon(item_id)
+
+        def realm_price(rid):
+            try:
+                return get_realm_price(rid, item_id)
+            except Exception:
+                pass
+            # refresh failed; fall back to whatever is cached
+            try:
+                return get_cached_price(rid, item_id)
+            except Exception as e:
+                print(f"Price lookup failed for realm {rid}: {e}")
+                return None
+
+        realms = load_selected_realms()
+        try:
+            # item name, icon and TSM stats are independent lookups; run them side by side
+            name_f  = EXECUTOR.submit(get_blizzard_name, item_id)
+            icon_f  = EXECUTOR.submit(fetch_icon)
+            stats_f = EXECUTOR.submit(get_tsm_region_stats, item_id)
+            # realms with a fresh snapshot are answered in one batched read; only the rest need workers
+            fresh = get_fresh_prices(realms, item_id)
+            futures = {
+                EXECUTOR.submit(realm_price, rid): rname
+                for rid, rname in realms.items() if rid not in fresh
+            }
+        except RuntimeError:
+            return  # EXECUTOR was shut down because the window closed
+
+        # a failed lookup degrades to a placeholder instead of killing this thread
+        mv, sr = _result(stats_f, (None, None))
+        name   = _result(name_f, "Unknown Item")
+        icon   = _result(icon_f, None)
+        self._post(seq, self._show_item, item_id, name, icon, mv, sr)
+        for rid, price in fresh.items():
+            self._post(seq, self._insert_row, realms[rid], price, mv)
+        # populate tree as each remaining realm resolves
+        for fut in as_completed(futures):
+            if seq != self._query_seq:
+                break  # superseded; remaining lookups still finish and warm the cache
+            self._post(seq, self._insert_row, futures[fut], _result(fut, None), mv)
+
+    def _show_item(self, item_id, name, icon, mv, sr):
+        img = self._icons.get(item_id)
+        if img is None and icon:
+            # bytes arrive pre-resized to ICON_SIZE
+            img = ImageTk.PhotoImage(Image.open(io.BytesIO(icon)))
+            self._icons[item_id] = img
+            if len(self._icons) > ICON_CACHE_SIZE:
+                self._icons.popitem(last=False)
+        if img is not None:
             self.item_img.config(image=img)
             self.item_img.image = img
         else:
             self.item_img.config(image=self.placeholder_img)
             self.item_img.image = self.placeholder_img
         self.item_name.config(text=name)
-        # fetch & display stats
-        mv, sr = get_tsm_region_stats(item_id)
+        # display stats
         self.mv_label.config(
             text=f"Market Value: {format_price(mv)}" if mv else "Market Value: —"
         )
         self.sale_label.config(
             text=f"Sale Rate: {sr:.1%}" if sr else "Sale Rate: —"
         )
-        # populate tree
-        for rid, rname in load_selected_realms().items():
-            price = get_cached_price(rid, item_id)
-            if price is None:
-                # fetch live auction data and cache
-                try:
-                    realm_data = cache_realm_auctions(rid)
-                    price = realm_data.get(str(item_id))
-                except Exception:
-                    price = None
-            if price is None:
-                buy, diff, tag = "—", "—", ""
+
+    def _insert_row(self, rname, price, mv):
+        diff_pct = None
+        if price is None:
+            buy, diff, tag = "—", "—", ""
+        else:
+            buy = format_price(price)
+            if mv is not None:
+                diff_pct = (price - mv) / mv * 100
+                diff = f"{diff_pct:+.1f}%"
+                tag = "overpriced" if diff_pct > 0 else "undercut" if diff_pct < 0 else ""
             else:
-                buy = format_price(price)
-                if mv is not None:
-                    diff_pct = (price - mv) / mv * 100
-                    diff = f"{diff_pct:+.1f}%"
-                    tag = "overpriced" if diff_pct > 0 else "undercut" if diff_pct < 0 else ""
-                else:
-                    diff, tag = "—", ""
-            self.tree.insert(
-                "",
-                "end",
-                values=(rname, buy, diff),
-                tags=(tag,)
-            )
+                diff, tag = "—", ""
+        iid = self.tree.insert(
+            "",
+            "end",
+            values=(rname, buy, diff),
+            tags=(tag,)
+        )
+        self._sort_keys[iid] = {"Realm": rname.lower(), "Buyout": price, "Diff": diff_pct}
+
+    def _on_close(self):
+        # Pool threads are joined at interpreter exit; drop queued realm downloads
+        # so closing the window doesn't wait for them. Live driver threads see
+        # _closing / the bumped seq and stop posting to the destroyed root.
+        self._closing = True
+        self._query_seq += 1
+        EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        FILL_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
     def run(self):
         self.root.mainloop()
@@ -1,6 +1,9 @@
 # --- utils.py ---
 import os
 import sys
+import hashlib
+import tempfile
+from functools import lru_cache
 from PIL import Image, ImageTk
 
 def resource_path(relative_path):
@@ -11,17 +14,56 @@ def resource_path(relative_path):
         base_path = os.path.abspath(os.path.dirname(__file__))
     return os.path.join(base_path, relative_path)
 
+# Pre-sized copies of UI assets, so the LANCZOS resize only runs once per asset/size
+ICON_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "icons")
+
 def _load_icon(path, size):
     """Load & resize an asset; return a PhotoImage or None on failure."""
     try:
-        img = Image.open(resource_path(path)).resize(size, Image.LANCZOS)
+        src = resource_path(path)
+        st = os.stat(src)
+        key = hashlib.sha1(f"{path}|{size}|{st.st_size}|{st.st_mtime_ns}".encode()).hexdigest()
+        cached = os.path.join(ICON_CACHE_DIR, f"{key}.png")
+        # Decode fully inside `with` so the file handle is closed before returning
+        if os.path.isfile(cached):
+            try:
+                with Image.open(cached) as im:
+                    im.load()
+                    return ImageTk.PhotoImage(im)
+            except OSError:
+                # Unreadable copy (e.g. truncated): drop it and rebuild from src
+                try:
+                    os.remove(cached)
+                except OSError:
+                    pass
+        with Image.open(src) as im:
+            im.load()
+            img = im.resize(size, Image.LANCZOS)
+        tmp = None
+        try:
+            os.makedirs(ICON_CACHE_DIR, exist_ok=True)
+            # Write beside the target and swap it in, so a reader never sees a partial file
+            fd, tmp = tempfile.mkstemp(dir=ICON_CACHE_DIR, suffix=".png")
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, format="PNG", optimize=True)
+            os.replace(tmp, cached)
+        except OSError:
+            # read-only install or failed write; just resize again next launch
+            if tmp is not None and os.path.exists(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
         return ImageTk.PhotoImage(img)
     except Exception:
         return None
 
+@lru_cache(maxsize=1024)  # realm dumps repeat the same round prices a lot
 def format_price(c):
     """Convert a copper value into 'Xg Ys Zc' format."""
     if c is None:
         return "—"
-    return f"{c//10000}g {(c%10000)//100}s {c%100}c"
+    g, rem = divmod(c, 10000)
+    s, c = divmod(rem, 100)
+    return f"{g}g {s}s {c}c"
 